@@ -101,7 +101,7 @@ _io = [
     ("ddram_clock", 0,
         Subsignal("p", Pins("G3")),
         Subsignal("n", Pins("G1")),
-        IOStandard("MOBILE_DDR")
+        IOStandard("DIFF_MOBILE_DDR")
     ),
 
     ("ddram", 0,
@@ -18,9 +18,32 @@ from misoc.cores import spi_flash
 from misoc.integration.soc_sdram import *
 
 from ..platforms import pipistrello_i2c
-from migen.build.platforms import pipistrello
 
-i2cslave_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)))
+i2cslave_dir = os.path.abspath(os.path.dirname(__file__))
+_SOFTWARE_DIR = os.path.join(i2cslave_dir, "..", "software")
+
+_PLL_F0 = Fraction(50, 1)*1000000
+_PLL_P = 12
+
+
+def _pll_mult_div(clk_freq):
+    f = Fraction(clk_freq*_PLL_P, _PLL_F0)
+    return f.numerator, f.denominator
+
+
+_DEFAULT_CLK_FREQ = (83 + Fraction(1, 3))*1000*1000
+
+# PLL (CLKFBOUT_MULT, DIVCLK_DIVIDE) for known sys clock frequencies
+_PLL_PRESETS = {
+    _DEFAULT_CLK_FREQ: (20, 1),
+}
+assert all(_pll_mult_div(clk_freq) == nd for clk_freq, nd in _PLL_PRESETS.items())
+
+_PLL_FIXED = dict(p_SIM_DEVICE="SPARTAN6",
+                  p_BANDWIDTH="OPTIMIZED", p_COMPENSATION="INTERNAL",
+                  p_REF_JITTER=.01, p_CLK_FEEDBACK="CLKFBOUT")
+# dynamic reconfiguration port is unused
+_PLL_DRP_TIE_OFF = dict(i_DADDR=0, i_DCLK=0, i_DEN=0, i_DI=0, i_DWE=0, i_RST=0, i_REL=0)
 
 
 class I2CShiftReg(Module, AutoCSR):
@@ -253,10 +276,12 @@ class _CRG(Module):
         self.clk4x_wr_strb = Signal()
         self.clk4x_rd_strb = Signal()
 
-        f0 = Fraction(50, 1)*1000000
-        p = 12
-        f = Fraction(clk_freq*p, f0)
-        n, d = f.numerator, f.denominator
+        f0 = _PLL_F0
+        p = _PLL_P
+        try:
+            n, d = _PLL_PRESETS[clk_freq]
+        except KeyError:
+            n, d = _pll_mult_div(clk_freq)
         assert 19e6 <= f0/d <= 500e6  # pfd
         assert 400e6 <= f0*n/d <= 1080e6  # vco
 
@@ -270,27 +295,27 @@ class _CRG(Module):
         pll_lckd = Signal()
         pll_fb = Signal()
         pll = Signal(6)
-        self.specials.pll = Instance("PLL_ADV", p_SIM_DEVICE="SPARTAN6",
-                                     p_BANDWIDTH="OPTIMIZED", p_COMPENSATION="INTERNAL",
-                                     p_REF_JITTER=.01, p_CLK_FEEDBACK="CLKFBOUT",
-                                     i_DADDR=0, i_DCLK=0, i_DEN=0, i_DI=0, i_DWE=0, i_RST=0, i_REL=0,
-                                     p_DIVCLK_DIVIDE=d, p_CLKFBOUT_MULT=n, p_CLKFBOUT_PHASE=0.,
+        pll_clkouts = {}
+        for i, (phase, div) in enumerate([
+                (0., p//4),  # sdram wr rd
+                (0., p//4),
+                (270., p//2),  # sdram dqs adr ctrl
+                (250., p//2),  # off-chip ddr
+                (0., p//1),
+                (0., p//1),  # sys
+            ]):
+            pll_clkouts["o_CLKOUT{}".format(i)] = pll[i]
+            pll_clkouts["p_CLKOUT{}_DUTY_CYCLE".format(i)] = .5
+            pll_clkouts["p_CLKOUT{}_PHASE".format(i)] = phase
+            pll_clkouts["p_CLKOUT{}_DIVIDE".format(i)] = div
+        pll_params = dict(_PLL_FIXED)
+        pll_params.update(_PLL_DRP_TIE_OFF)
+        pll_params.update(pll_clkouts)
+        self.specials.pll = Instance("PLL_ADV", p_DIVCLK_DIVIDE=d, p_CLKFBOUT_MULT=n, p_CLKFBOUT_PHASE=0.,
                                      i_CLKIN1=clk50b, i_CLKIN2=0, i_CLKINSEL=1,
                                      p_CLKIN1_PERIOD=1e9/f0, p_CLKIN2_PERIOD=0.,
                                      i_CLKFBIN=pll_fb, o_CLKFBOUT=pll_fb, o_LOCKED=pll_lckd,
-                                     o_CLKOUT0=pll[0], p_CLKOUT0_DUTY_CYCLE=.5,
-                                     o_CLKOUT1=pll[1], p_CLKOUT1_DUTY_CYCLE=.5,
-                                     o_CLKOUT2=pll[2], p_CLKOUT2_DUTY_CYCLE=.5,
-                                     o_CLKOUT3=pll[3], p_CLKOUT3_DUTY_CYCLE=.5,
-                                     o_CLKOUT4=pll[4], p_CLKOUT4_DUTY_CYCLE=.5,
-                                     o_CLKOUT5=pll[5], p_CLKOUT5_DUTY_CYCLE=.5,
-                                     p_CLKOUT0_PHASE=0., p_CLKOUT0_DIVIDE=p//4,  # sdram wr rd
-                                     p_CLKOUT1_PHASE=0., p_CLKOUT1_DIVIDE=p//4,
-                                     p_CLKOUT2_PHASE=270., p_CLKOUT2_DIVIDE=p//2,  # sdram dqs adr ctrl
-                                     p_CLKOUT3_PHASE=250., p_CLKOUT3_DIVIDE=p//2,  # off-chip ddr
-                                     p_CLKOUT4_PHASE=0., p_CLKOUT4_DIVIDE=p//1,
-                                     p_CLKOUT5_PHASE=0., p_CLKOUT5_DIVIDE=p//1,  # sys
-        )
+                                     **pll_params)
         self.specials += Instance("BUFG", i_I=pll[5], o_O=self.cd_sys.clk)
         reset = platform.request("user_btn")
         self.clock_domains.cd_por = ClockDomain()
@@ -311,26 +336,20 @@ class _CRG(Module):
         clk_sdram_half_shifted = Signal()
         self.specials += Instance("BUFG", i_I=pll[3], o_O=clk_sdram_half_shifted)
         clk = platform.request("ddram_clock")
+        ddr_clk = Signal()
         self.specials += Instance("ODDR2", p_DDR_ALIGNMENT="NONE",
                                   p_INIT=0, p_SRTYPE="SYNC",
                                   i_D0=1, i_D1=0, i_S=0, i_R=0, i_CE=1,
                                   i_C0=clk_sdram_half_shifted, i_C1=~clk_sdram_half_shifted,
-                                  o_Q=clk.p)
-        self.specials += Instance("ODDR2", p_DDR_ALIGNMENT="NONE",
-                                  p_INIT=0, p_SRTYPE="SYNC",
-                                  i_D0=0, i_D1=1, i_S=0, i_R=0, i_CE=1,
-                                  i_C0=clk_sdram_half_shifted, i_C1=~clk_sdram_half_shifted,
-                                  o_Q=clk.n)
+                                  o_Q=ddr_clk)
+        self.specials += Instance("OBUFDS", i_I=ddr_clk, o_O=clk.p, o_OB=clk.n)
 
 
 class BaseSoC(SoCSDRAM):
-    csr_map = {
-        "spiflash": 16,
-    }
-    csr_map.update(SoCSDRAM.csr_map)
+    csr_map = dict(SoCSDRAM.csr_map, spiflash=16)
 
-    def __init__(self, clk_freq=(83 + Fraction(1, 3))*1000*1000,
-                 platform=pipistrello.Platform(), **kwargs):
+    def __init__(self, clk_freq=_DEFAULT_CLK_FREQ,
+                 platform=pipistrello_i2c.Platform(), **kwargs):
         SoCSDRAM.__init__(self, platform, clk_freq,
                           cpu_reset_address=0x170000,  # 1.5 MB
                           **kwargs)
@@ -367,10 +386,7 @@ papilio_adapter_io = [
 
 class I2CSoC(BaseSoC):
 
-    csr_map = {
-        "i2c": 17,
-    }
-    csr_map.update(BaseSoC.csr_map)
+    csr_map = dict(BaseSoC.csr_map, i2c=17)
 
     def __init__(self, **kwargs):
         BaseSoC.__init__(self, platform=pipistrello_i2c.Platform(), **kwargs)
@@ -393,8 +409,7 @@ def main():
 
     soc = I2CSoC(**soc_pipistrello_argdict(args))
     builder = Builder(soc, **builder_argdict(args))
-    builder.add_software_package("software", os.path.join(i2cslave_dir,
-                                                         "..", "software"))
+    builder.add_software_package("software", _SOFTWARE_DIR)
     builder.build()
 
 